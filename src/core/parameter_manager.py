@@ -1,6 +1,26 @@
 import os
+import re
+import pickle
 import logging
+import uuid
 import numpy as np
+from collections import OrderedDict
+
+def _write_atomic(path, data):
+    """
+    Writes bytes to path through a tmp file + os.replace. The tmp name is
+    unique per process and call, so parallel writers of the same path never
+    swap in each other's half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 class ParameterManager:
     """
@@ -19,6 +39,18 @@ class ParameterManager:
         self.MASS_PENALTY_FACTOR = 0.5  
         self.INERTIA_SCALING = 1.05
 
+        # Template split into [text, slot, text, ...] per key signature,
+        # each stamped with the template version (mtime, size) it was parsed
+        # from. Persisted next to the template; stale splits are dropped.
+        self._template_cache = {}
+        self._template_version = None
+        self._template_cache_path = template_path + ".pkl"
+        self._load_template_cache()
+
+        # Fully rendered files for recently injected parameter sets (LRU)
+        self.CONTENT_CACHE_SIZE = 256
+        self._content_cache = OrderedDict()
+
         # --- CORRECTED CARMAKER KEY MAPPING ---
         # Based on actual FSE_AllWheelDrive file format
         self.PARAM_MAP = {
@@ -46,13 +78,10 @@ class ParameterManager:
         Only modifies parameters that exist in PARAM_MAP.
         """
         try:
-            if not os.path.exists(self.template_path):
+            if not self._check_template():
                 self.logger.error(f"Template not found: {self.template_path}")
                 return False
 
-            with open(self.template_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-
             # Calculate any mass penalties
             mass_updates = self._calculate_mass_penalty(parameters)
             raw_params = {**parameters, **mass_updates}
@@ -70,52 +99,7 @@ class ParameterManager:
 
             self.logger.info(f"   -> Injecting {len(valid_params)} parameters")
             
-            new_lines = []
-            keys_handled = set()
-
-            # Process each line
-            for line in lines:
-                line_handled = False
-                stripped = line.strip()
-                
-                # Check if this line matches any parameter we want to change
-                for key, val in valid_params.items():
-                    # Match "Key = Value" or "Key = ..." pattern
-                    if stripped.startswith(key):
-                        # Check next character is space, =, or tab
-                        if len(stripped) > len(key) and stripped[len(key)] in [' ', '=', '\t']:
-                            # Special handling for damper amplify (has $ variable)
-                            if "Amplify" in key:
-                                # Convert raw damping value to amplify factor
-                                # Base values from template: ~150-500 N/(m/s)
-                                # User values: 500-8000 N/(m/s)
-                                # Amplify = user_value / base_value
-                                base_value = 1.0  # We'll scale relative to current Amplify
-                                
-                                # Extract current amplify if it exists
-                                if "=" in stripped:
-                                    parts = stripped.split("=")
-                                    if len(parts) > 1:
-                                        try:
-                                            current = parts[1].strip().replace("$amp=", "")
-                                            base_value = float(current)
-                                        except:
-                                            base_value = 1.0
-                                
-                                # Calculate new amplify factor
-                                # Assuming base damping ~2000 N/(m/s)
-                                new_amplify = val / 2000.0
-                                new_lines.append(f"{key} = {new_amplify:.3f}\n")
-                            else:
-                                # Simple value replacement
-                                new_lines.append(f"{key} = {val}\n")
-                            
-                            keys_handled.add(key)
-                            line_handled = True
-                            break
-                
-                if not line_handled:
-                    new_lines.append(line)
+            data, keys_handled = self._render_file(valid_params)
 
             # Log what was changed
             if keys_handled:
@@ -123,9 +107,8 @@ class ParameterManager:
             else:
                 self.logger.warning(f"   -> No parameters were modified!")
 
-            # Write output
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.writelines(new_lines)
+            # Write output atomically (CarMaker must never see a half-written file)
+            _write_atomic(output_path, data)
             
             return True
 
@@ -135,6 +118,125 @@ class ParameterManager:
             traceback.print_exc()
             return False
 
+    def _template_stat(self):
+        """(mtime_ns, size) of the template; raises OSError if it is missing."""
+        st = os.stat(self.template_path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _check_template(self):
+        """
+        Stats the template once per injection. If it changed since the caches
+        were built, the pre-split templates and rendered files are dropped.
+        Returns False if the template does not exist.
+        """
+        try:
+            version = self._template_stat()
+        except OSError:
+            return False
+        if version != self._template_version:
+            self._template_cache = {}
+            self._content_cache.clear()
+            self._template_version = version
+        return True
+
+    def _render_file(self, valid_params):
+        """
+        Returns (encoded file bytes, keys written) for one parameter set.
+        Identical sets (re-proposed by the sampler) are served from an LRU.
+        """
+        # type() is part of the key: 4000 and 4000.0 hash equal but print differently
+        cache_key = tuple(sorted((k, type(v), v) for k, v in valid_params.items()))
+        cached = self._content_cache.get(cache_key)
+        if cached is not None:
+            self._content_cache.move_to_end(cache_key)
+            return cached
+
+        # Interleave the pre-split template text with the rendered values
+        parts, slots = self._load_template(valid_params)
+        pieces = [parts[0]]
+        for key, text in zip(slots, parts[1:]):
+            pieces.append(self._render_value(key, valid_params[key]))
+            pieces.append(text)
+        content = "".join(pieces)
+
+        # Same bytes a text-mode write would produce on this platform
+        data = content.replace("\n", os.linesep).encode('utf-8')
+        result = (data, frozenset(slots))
+
+        self._content_cache[cache_key] = result
+        if len(self._content_cache) > self.CONTENT_CACHE_SIZE:
+            self._content_cache.popitem(last=False)
+        return result
+
+    def _load_template(self, keys):
+        """
+        Splits the template once per key signature into literal text and
+        value slots, so every trial with the same keys is a plain join.
+        Returns (parts, slots) with len(parts) == len(slots) + 1.
+        """
+        signature = frozenset(keys)
+        cached = self._template_cache.get(signature)
+        if cached is not None:
+            return cached[1:]
+
+        # Stamped with the version seen before reading: an edit racing the
+        # read leaves an older stamp, which the next _check_template drops
+        version = self._template_version
+        with open(self.template_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+
+        parts, slots = [], []
+        pos = 0
+        if signature:
+            # A single alternation of every key, anchored per line and followed
+            # by space, '=' or tab (so that "SuspF.Spring" never matches
+            # "SuspF.Spring.Amplify"). The whole line becomes the slot.
+            pattern = re.compile(
+                r"^[ \t]*(" + "|".join(map(re.escape, signature)) + r")[ =\t].*$",
+                re.MULTILINE,
+            )
+            for match in pattern.finditer(content):
+                parts.append(content[pos:match.start()])
+                slots.append(match.group(1))
+                pos = match.end()
+        parts.append(content[pos:])
+
+        self._template_cache[signature] = (version, parts, slots)
+        self._save_template_cache()
+        return parts, slots
+
+    def _load_template_cache(self):
+        """Restores the pickled splits that were parsed from the current template."""
+        try:
+            version = self._template_stat()
+            with open(self._template_cache_path, 'rb') as f:
+                splits = pickle.load(f)["splits"]
+            self._template_cache = {
+                signature: (v, parts, slots)
+                for signature, (v, parts, slots) in splits.items() if v == version
+            }
+            self._template_version = version
+        except Exception:
+            pass
+
+    def _save_template_cache(self):
+        try:
+            # Written aside and swapped in, so a reader never sees half a pickle
+            data = pickle.dumps({"splits": self._template_cache}, protocol=pickle.HIGHEST_PROTOCOL)
+            _write_atomic(self._template_cache_path, data)
+        except Exception as e:
+            self.logger.warning(f"Could not persist template cache: {e}")
+
+    def _render_value(self, key, val):
+        """Formats a single 'Key = Value' line for the vehicle file."""
+        # Special handling for damper amplify (has $ variable)
+        if "Amplify" in key:
+            # Convert raw damping value to amplify factor
+            # Assuming base damping ~2000 N/(m/s)
+            return f"{key} = {val / 2000.0:.3f}"
+        # Simple value replacement
+        return f"{key} = {val}"
+
     def _calculate_mass_penalty(self, parameters):
         """Calculate mass penalty for geometry changes"""
         geo_keywords = ["Wishbone", "Tierod", "Rack", "Pushrod"]
@@ -1,4 +1,4 @@
-import numpy as np
+import math
 import logging
 
 class PhysicsValidator:
@@ -24,13 +24,30 @@ class PhysicsValidator:
         self.MAX_FREQ_HZ = 4.5
         self.MAX_STATIC_SAG_MM = 25.0 # Max compression under gravity
         self.MIN_STATIC_SAG_MM = 5.0
+        self.MIN_FREQ_RATIO = 0.7
+        self.MAX_FREQ_RATIO = 1.5
+
+        # --- PRE-FOLDED WHEEL RATE WINDOWS ---
+        # f = (1/2pi) * sqrt(k / m)  ->  k = m * (2pi * f)^2
+        # Sag = (m * g) / k          ->  k = (m * g) / Sag
+        # Folding the limits into k once turns every check into a plain compare.
+        w_min = (2 * math.pi * self.MIN_FREQ_HZ) ** 2
+        w_max = (2 * math.pi * self.MAX_FREQ_HZ) ** 2
+        self._K_FREQ_F = (self.m_s_f * w_min, self.m_s_f * w_max)
+        self._K_FREQ_R = (self.m_s_r * w_min, self.m_s_r * w_max)
+        self._K_SAG_F = (self.m_s_f * 9.81 * 1000 / self.MAX_STATIC_SAG_MM,
+                         self.m_s_f * 9.81 * 1000 / self.MIN_STATIC_SAG_MM)
+        self._K_SAG_R = (self.m_s_r * 9.81 * 1000 / self.MAX_STATIC_SAG_MM,
+                         self.m_s_r * 9.81 * 1000 / self.MIN_STATIC_SAG_MM)
+        # ratio^2 = (k_f / m_f) / (k_r / m_r), compared without the sqrt
+        self._RATIO_SQ = (self.MIN_FREQ_RATIO ** 2, self.MAX_FREQ_RATIO ** 2)
+        self._MASS_RATIO_RF = self.m_s_r / self.m_s_f
 
     def check_viability(self, params: dict) -> tuple[bool, str]:
         """
         Returns: (is_valid, reason)
         """
-        # 1. Calculate Ride Frequencies (Hz)
-        # f = (1/2pi) * sqrt(k / m)
+        # 1. Wheel Rates (N/m)
         # Note: We assume Motion Ratio (MR) ~ 1.0 for simplicity, 
         # or that 'k_spring' is Wheel Rate. If k is Spring Rate, k_wheel = k_spring * MR^2
         mr_front = 1.0 # Update if Bellcrank exists
@@ -39,33 +56,37 @@ class PhysicsValidator:
         k_f = params.get("Spring_F", 0) * (mr_front**2)
         k_r = params.get("Spring_R", 0) * (mr_rear**2)
         
-        freq_f = (1 / (2 * np.pi)) * np.sqrt(k_f / self.m_s_f)
-        freq_r = (1 / (2 * np.pi)) * np.sqrt(k_r / self.m_s_r)
-        
         # CHECK 1: Frequency Range (Comfort vs Grip window)
-        if not (self.MIN_FREQ_HZ <= freq_f <= self.MAX_FREQ_HZ):
-            return False, f"Front Freq {freq_f:.2f}Hz out of bounds"
+        # Frequencies are only evaluated for the failure message.
+        k_lo, k_hi = self._K_FREQ_F
+        if not (k_lo <= k_f <= k_hi):
+            return False, f"Front Freq {self._ride_freq(k_f, self.m_s_f):.2f}Hz out of bounds"
             
-        if not (self.MIN_FREQ_HZ <= freq_r <= self.MAX_FREQ_HZ):
-            return False, f"Rear Freq {freq_r:.2f}Hz out of bounds"
+        k_lo, k_hi = self._K_FREQ_R
+        if not (k_lo <= k_r <= k_hi):
+            return False, f"Rear Freq {self._ride_freq(k_r, self.m_s_r):.2f}Hz out of bounds"
 
         # CHECK 2: Flat Ride / Pitch Sensitivity
         # Usually Rear Freq > Front Freq is preferred for flat ride,
         # but in Aero cars (FS), stiff front is common for platform control.
         # We just check they aren't wildly mismatched.
-        ratio = freq_f / freq_r
-        if ratio > 1.5 or ratio < 0.7:
-             return False, f"Freq Imbalance F/R ratio: {ratio:.2f}"
+        ratio_sq = (k_f / k_r) * self._MASS_RATIO_RF
+        if ratio_sq > self._RATIO_SQ[1] or ratio_sq < self._RATIO_SQ[0]:
+             return False, f"Freq Imbalance F/R ratio: {math.sqrt(ratio_sq):.2f}"
 
         # CHECK 3: Static Sag (Gravity Drop)
         # Sag = F / k = (m * g) / k
-        sag_f = (self.m_s_f * 9.81) / k_f * 1000 # mm
-        sag_r = (self.m_s_r * 9.81) / k_r * 1000 # mm
-        
-        if sag_f > self.MAX_STATIC_SAG_MM or sag_f < self.MIN_STATIC_SAG_MM:
-            return False, f"Front Static Sag {sag_f:.1f}mm invalid"
+        k_lo, k_hi = self._K_SAG_F
+        if k_f < k_lo or k_f > k_hi:
+            return False, f"Front Static Sag {(self.m_s_f * 9.81) / k_f * 1000:.1f}mm invalid"
             
-        if sag_r > self.MAX_STATIC_SAG_MM or sag_r < self.MIN_STATIC_SAG_MM:
-            return False, f"Rear Static Sag {sag_r:.1f}mm invalid"
+        k_lo, k_hi = self._K_SAG_R
+        if k_r < k_lo or k_r > k_hi:
+            return False, f"Rear Static Sag {(self.m_s_r * 9.81) / k_r * 1000:.1f}mm invalid"
+
+        return True, "Valid"
 
-        return True, "Valid"
\ No newline at end of file
+    @staticmethod
+    def _ride_freq(k, m):
+        """Natural frequency (Hz) of a corner with wheel rate k on sprung mass m."""
+        return math.sqrt(max(k, 0.0) / m) / (2 * math.pi)
@@ -35,6 +35,9 @@ class ResourceManager:
             self.logger.error(f"Failed to create campaign folder: {e}")
             raise
 
+        # The campaign folder never moves, so the DB URL is derived once
+        self._db_url = self._build_db_url()
+
     def setup_trial_folder(self, trial_number):
         """
         Creates a sub-folder for a specific run (e.g., Trial_042).
@@ -55,6 +58,9 @@ class ResourceManager:
         Returns the SQLalchemy connection string for the database.
         We place the DB inside the campaign folder so it's portable.
         """
+        return self._db_url
+
+    def _build_db_url(self):
         # SQLite needs 3 slashes for relative path, 4 for absolute.
         # We use absolute path to be safe.
         db_file_path = os.path.join(self.campaign_folder, 'optimization.db')
@@ -1,15 +1,154 @@
 import numpy as np
+import math
 import os
+import json
 import joblib
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import Matern, WhiteKernel, ConstantKernel
 from sklearn.base import clone
+from scipy.linalg import cho_solve, solve_triangular
+from scipy.special import ndtr
+from scipy.spatial.distance import cdist
 import logging
 import warnings
 
 warnings.filterwarnings("ignore")
 logger = logging.getLogger(__name__)
 
+def _append_observation(gp, x_new, y):
+    """
+    Adds one training point to a fitted GaussianProcessRegressor without
+    refitting. The Cholesky factor of K + alpha*I grows by one row via a
+    triangular solve, O(N^2) instead of O(N^3); the kernel hyperparameters
+    stay at their last optimized values.
+    
+    y: every (already standardized) target of the model, including the new
+    one, in training order.
+    """
+    L = gp.L_
+    n = L.shape[0]
+    k = gp.kernel_(gp.X_train_, x_new)[:, 0]
+    k_ss = gp.kernel_.diag(x_new)[0] + gp.alpha
+    l = solve_triangular(L, k, lower=True, check_finite=False, overwrite_b=True)
+    d2 = k_ss - l @ l
+    if d2 <= 0.0:
+        raise np.linalg.LinAlgError("Rank-1 update lost positive definiteness")
+
+    L_new = np.zeros((n + 1, n + 1))
+    L_new[:n, :n] = L
+    L_new[n, :n] = l
+    L_new[n, n] = np.sqrt(d2)
+
+    y = np.asarray(y, dtype=float)
+    gp.X_train_ = np.vstack([gp.X_train_, x_new])
+    gp.y_train_ = y
+    gp.L_ = L_new
+    gp.alpha_ = cho_solve((L_new, True), y, check_finite=False)
+
+def _gp_predict(gp, X, return_std=True, y_mean=0.0, y_std=1.0, K_trans=None):
+    """
+    Posterior mean (and std) of a fitted GaussianProcessRegressor straight
+    from its cached Cholesky factor: one cross-kernel evaluation and one
+    triangular solve (Rasmussen & Williams Alg. 2.1), never forming K^-1
+    and skipping sklearn's input validation.
+    y_mean/y_std undo the target standardization done before fitting.
+    K_trans: precomputed k(X_train_, X), e.g. from _cross_kernel; it is
+    used as scratch space and overwritten.
+    Returns (mu, sigma); sigma is None when return_std is False.
+    """
+    if not hasattr(gp, "L_"):
+        # Not fitted yet: sklearn answers from the GP prior
+        if return_std:
+            mu, sigma = gp.predict(X, return_std=True)
+            return y_std * mu + y_mean, sigma * y_std
+        return y_std * gp.predict(X) + y_mean, None
+
+    if K_trans is None:
+        K_trans = gp.kernel_(gp.X_train_, X)  # (N, M)
+    mu = y_std * (K_trans.T @ gp.alpha_) + y_mean
+    if not return_std:
+        return mu, None
+
+    V = solve_triangular(gp.L_, K_trans, lower=True, check_finite=False, overwrite_b=True)
+    var = gp.kernel_.diag(X) - np.einsum("ij,ij->j", V, V)
+    np.maximum(var, 0.0, out=var)
+    sigma = np.sqrt(var) * y_std
+    return mu, sigma
+
+def _cross_kernel(gp, D):
+    """
+    k(X_train_, X) of a fitted C * Matern(nu=2.5) + White kernel evaluated
+    from precomputed Euclidean distances D (the white noise only sits on
+    the training diagonal, so it drops out of cross terms).
+    Returns None for anisotropic length scales, where D is not enough.
+    """
+    cm = gp.kernel_.k1
+    length_scale = cm.k2.length_scale
+    if np.ndim(length_scale) != 0:
+        return None
+    r = (np.sqrt(5.0) / length_scale) * D
+    return cm.k1.constant_value * (1.0 + r + r * r / 3.0) * np.exp(-r)
+
+def _fit_gp(gp, X, y, optimize=True):
+    """
+    Fits a GaussianProcessRegressor. Without optimize, a previously fitted
+    model reuses its kernel_ hyperparameters (optimizer=None), so the fit
+    is a single Cholesky instead of n_restarts_optimizer L-BFGS runs.
+    """
+    if optimize or not hasattr(gp, "kernel_"):
+        gp.fit(X, y)
+        return
+
+    # fit() starts from clone(gp.kernel), so hand it the fitted kernel_
+    optimizer, kernel = gp.optimizer, gp.kernel
+    gp.optimizer, gp.kernel = None, gp.kernel_
+    try:
+        gp.fit(X, y)
+    finally:
+        gp.optimizer, gp.kernel = optimizer, kernel
+
+def _gp_state(gp):
+    """Fitted quantities needed to predict/extend without refitting (None if unfitted)."""
+    if not hasattr(gp, "L_"):
+        return None
+    return {"theta": gp.kernel_.theta, "X_train": gp.X_train_, "y_train": gp.y_train_,
+            "L": gp.L_, "alpha": gp.alpha_}
+
+def _restore_gp(gp, state):
+    """Inverse of _gp_state: re-attaches a saved factorization to an unfitted gp."""
+    if state is None:
+        return
+    kernel = clone(gp.kernel)
+    kernel.theta = state["theta"]
+    gp.kernel_ = kernel
+    gp.X_train_ = state["X_train"]
+    gp.y_train_ = state["y_train"]
+    gp.L_ = state["L"]
+    gp.alpha_ = state["alpha"]
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+def _expected_improvement(mu, sigma, best):
+    """
+    Vectorized EI for minimization over arrays of posterior mean/std.
+    Uses the ndtr ufunc and the analytic normal pdf directly instead of
+    the scipy.stats.norm distribution dispatch.
+    """
+    imp = best - mu
+    Z = imp / (sigma + 1e-9)
+    return imp * ndtr(Z) + sigma * (_INV_SQRT_2PI * np.exp(-0.5 * Z * Z))
+
+_SQRT_2 = math.sqrt(2.0)
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+def _expected_improvement_scalar(mu, sigma, best):
+    """Scalar EI (minimization) via math.erf, for single-candidate queries."""
+    imp = best - mu
+    z = imp / (sigma + 1e-9)
+    cdf = 0.5 * (1.0 + math.erf(z / _SQRT_2))
+    pdf = math.exp(-0.5 * z * z) / _SQRT_2PI
+    return imp * cdf + sigma * pdf
+
 class SurrogateOracle:
     """
     GEN 6.0: Constrained Bayesian Optimization (cBO) Oracle.
@@ -20,19 +159,41 @@ class SurrogateOracle:
     """
     def __init__(self, storage_path="data/knowledge_base.pkl"):
         self.storage_path = storage_path
+        # Observations since the last snapshot, one JSON row per update
+        self.log_path = os.path.splitext(storage_path)[0] + ".jsonl"
+        self.snapshot_interval = 25
         
         # Generic Kernel
         kernel = ConstantKernel(1.0) * Matern(nu=2.5) + WhiteKernel(noise_level=0.1)
         
         # Dual Models [cite: 526-527]
-        self.model_time = GaussianProcessRegressor(kernel=clone(kernel), n_restarts_optimizer=2, normalize_y=True)
+        self.model_time = GaussianProcessRegressor(kernel=clone(kernel), n_restarts_optimizer=2, normalize_y=False) # Fed standardized lap times
         self.model_feas = GaussianProcessRegressor(kernel=clone(kernel), n_restarts_optimizer=2, normalize_y=False) # Predicts 0 or 1
         
         self.is_trained = False
-        self.X = []
+        # Observed parameter vectors live in a preallocated (capacity, d)
+        # buffer grown by doubling; self.X is a view of the filled rows.
+        self._X_buf = None
+        self._n = 0
         self.y_time = [] # Lap times (only for valid runs)
         self.y_feas = [] # 1.0 = Valid, 0.0 = Crash
         
+        # Lap-time standardization for model_time (set whenever it is fitted)
+        self._y_mean = 0.0
+        self._y_std = 1.0
+        
+        # Hyperparameters are re-optimized every `refit_interval` updates;
+        # in between, observations are folded in by rank-1 Cholesky updates.
+        self.refit_interval = 10
+        self._n_updates = 0
+        
+        # History cap: beyond this the most redundant observations are
+        # dropped so the O(N^3) refit stays bounded across warm starts.
+        # Pruning cuts down to prune_target, so the rank-1 path runs for
+        # the next (max_history - prune_target) updates before the next prune.
+        self.max_history = 500
+        self.prune_target = 450
+        
         self._load_state()
 
     def update(self, params: dict, cost: float, is_crash: bool):
@@ -40,68 +201,213 @@ class SurrogateOracle:
         Updates the knowledge base. 
         Note: If crash, 'cost' should be the Soft Penalty cost.
         """
-        x_vec = list(params.values())
-        
-        self.X.append(x_vec)
+        self.update_vec(list(params.values()), cost, is_crash)
+
+    def update_vec(self, x_vec, cost, is_crash):
+        """update() for a parameter vector already in PARAM order."""
+        self._record(x_vec, cost, is_crash)
+
+        self._n_updates += 1
+        pruned = self._prune()
+        if self._n_updates % self.refit_interval == 0:
+            self.train()
+        elif pruned or not self._extend(x_vec, is_crash):
+            self.train(optimize=False)
+
+        # O(d) append per update; the O(N^2) snapshot only every few updates
+        self._log_observation(x_vec, cost, is_crash)
+        if self._n_updates % self.snapshot_interval == 0:
+            self._save_state()
+
+    def _record(self, x_vec, cost, is_crash):
+        self._append_x(x_vec)
         self.y_feas.append(0.0 if is_crash else 1.0)
         
         # We only train the Time model on data that isn't a total failure
         # to prevent "poisoning" the regression with outliers.
         if not is_crash:
             self.y_time.append(cost)
+
+    @property
+    def X(self):
+        """Observed parameter vectors as an (N, d) view of the history buffer."""
+        if self._X_buf is None:
+            return np.empty((0, 0))
+        return self._X_buf[:self._n]
+
+    def _append_x(self, x_vec):
+        if self._X_buf is None:
+            self._X_buf = np.empty((64, len(x_vec)))
+        elif self._n == len(self._X_buf):
+            grown = np.empty((2 * len(self._X_buf), self._X_buf.shape[1]))
+            grown[:self._n] = self._X_buf[:self._n]
+            self._X_buf = grown
+        self._X_buf[self._n] = x_vec
+        self._n += 1
+
+    def _prune(self):
+        """
+        Once the history exceeds max_history, drops observations down to
+        prune_target. Points are ranked by
+        diag(K^-1) of the fitted feasibility GP (all rows): a large value
+        means a small leave-one-out variance, i.e. the rest of the history
+        already explains that point. The best valid lap is always kept.
+        Falls back to dropping the oldest rows if the factor is stale.
+        Returns True if the history changed (the GPs then need a refit).
+        """
+        if self._n <= self.max_history:
+            return False
+        excess = self._n - min(self.prune_target, self.max_history)
+
+        y_feas = np.asarray(self.y_feas)
+        valid = np.flatnonzero(y_feas > 0.5)
+
+        L = getattr(self.model_feas, "L_", None)
+        if L is not None and excess <= len(L) <= self._n:
+            # Only rows covered by the factor are candidates
+            L_inv = solve_triangular(L, np.eye(len(L)), lower=True, check_finite=False,
+                                     overwrite_b=True)
+            redundancy = np.einsum("ij,ij->j", L_inv, L_inv)
         else:
-            # Impute a pessimistic value for time to keep array lengths aligned if needed,
-            # or manage separate arrays (better).
-            pass 
+            redundancy = -np.arange(self._n, dtype=float) # Oldest first
+        if self.y_time and valid[np.argmin(self.y_time)] < len(redundancy):
+            redundancy[valid[np.argmin(self.y_time)]] = -np.inf
+        drop = np.argsort(redundancy)[::-1][:excess]
+
+        keep = np.ones(self._n, dtype=bool)
+        keep[drop] = False
+        X = self.X[keep]
+        self._X_buf[:len(X)] = X
+        self._n = len(X)
+        self.y_time = [y for y, k in zip(self.y_time, keep[valid]) if k]
+        self.y_feas = y_feas[keep].tolist()
+        return True
+
+    def _extend(self, x_vec, is_crash):
+        """
+        Rank-1 update of the fitted GPs with the newest observation.
+        Returns False if a model still needs its first full fit (or the
+        update is numerically unsafe), so the caller falls back to train().
+        """
+        if not self.is_trained or not hasattr(self.model_feas, "L_"):
+            return False
+        if not is_crash and not hasattr(self.model_time, "L_"):
+            return False
 
-        self.train()
-        self._save_state()
+        x_new = self.X[-1:]
+        try:
+            _append_observation(self.model_feas, x_new, self.y_feas)
+            if not is_crash:
+                _append_observation(self.model_time, x_new, self._time_targets())
+        except np.linalg.LinAlgError:
+            return False
+        return True
+
+    def _time_targets(self):
+        """Standardizes y_time for model_time and records the scale for predict."""
+        y = np.array(self.y_time, dtype=float)
+        self._y_mean = y.mean()
+        y_std = y.std()
+        self._y_std = y_std if y_std > 0.0 else 1.0
+        return (y - self._y_mean) / self._y_std
 
     def predict_score(self, params: dict):
         """
         UPGRADE: Expected Improvement (EI) Acquisition Function.
         Mathematically rigorous search used by AMZ/Delft.
         """
+        return self.predict_vec(list(params.values()))
+
+    def predict_vec(self, x_vec):
+        """predict_score() for a parameter vector already in PARAM order."""
         if not self.is_trained:
             return 1.0 # Pure exploration
 
-        x_in = np.array([list(params.values())])
-        
+        x = np.asarray(x_vec, dtype=float).reshape(1, -1)
+        K_time, K_feas = self._shared_cross_kernels(x)
+        mu, sigma = _gp_predict(self.model_time, x, y_mean=self._y_mean, y_std=self._y_std,
+                                K_trans=K_time)
+        current_best = min(self.y_time) if self.y_time else 100.0
+        ei = _expected_improvement_scalar(float(mu[0]), float(sigma[0]), current_best)
+
+        prob_success, _ = _gp_predict(self.model_feas, x, return_std=False, K_trans=K_feas)
+        prob_success = min(max(float(prob_success[0]), 0.0), 1.0)
+        return -(ei * prob_success)
+
+    def predict_batch(self, X):
+        """
+        Lap-time posterior (mu, sigma) for an (M, d) batch of candidates.
+        All M share one cross-kernel evaluation and one multi-RHS triangular solve.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        return _gp_predict(self.model_time, X, y_mean=self._y_mean, y_std=self._y_std)
+
+    def score_batch(self, X):
+        """
+        Vectorized predict_score for an (M, d) batch of candidates.
+        Returns the negative feasibility-weighted EI per row (lower is better).
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if not self.is_trained:
+            return np.ones(X.shape[0]) # Pure exploration
+
+        K_time, K_feas = self._shared_cross_kernels(X)
+
         # 1. Predict Mean and Uncertainty (Standard Deviation)
-        mu, sigma = self.model_time.predict(x_in, return_std=True)
+        mu, sigma = _gp_predict(self.model_time, X, y_mean=self._y_mean, y_std=self._y_std,
+                                K_trans=K_time)
         
         # 2. Get current best observed value
         current_best = min(self.y_time) if self.y_time else 100.0
         
         # 3. Calculate Expected Improvement
         # We want to minimize time, so improvement = (current_best - prediction)
-        with np.errstate(divide='warn'):
-            imp = current_best - mu
-            Z = imp / (sigma + 1e-9)
-            from scipy.stats import norm
-            ei = imp * norm.cdf(Z) + sigma * norm.pdf(Z)
+        ei = _expected_improvement(mu, sigma, current_best)
             
         # 4. Feasibility Weighting (Constraint)
-        prob_success, _ = self.model_feas.predict(x_in, return_std=True)
-        prob_success = np.clip(prob_success[0], 0.0, 1.0)
+        prob_success, _ = _gp_predict(self.model_feas, X, return_std=False, K_trans=K_feas)
+        prob_success = np.clip(prob_success, 0.0, 1.0)
         
         # Final Score: High EI * High Probability of Survival
         # We return negative because Optuna minimizes, but EI is "higher is better"
-        return -(ei[0] * prob_success)
+        return -(ei * prob_success)
+
+    def _shared_cross_kernels(self, X):
+        """
+        (K_time, K_feas) for query points X from a single distance matrix
+        against the history: model_feas is trained on every row, model_time
+        on the valid ones. An entry is None when its model is unfitted or
+        out of step with the history; _gp_predict then evaluates it itself.
+        """
+        if self._n == 0:
+            return None, None
+        D = cdist(self.X, X)
+        valid = np.flatnonzero(np.asarray(self.y_feas) > 0.5)
 
-    def train(self):
+        K_feas = K_time = None
+        if hasattr(self.model_feas, "L_") and len(self.model_feas.X_train_) == self._n:
+            K_feas = _cross_kernel(self.model_feas, D)
+        if hasattr(self.model_time, "L_") and len(self.model_time.X_train_) == len(valid):
+            K_time = _cross_kernel(self.model_time, D[valid])
+        return K_time, K_feas
+
+    def train(self, optimize=True):
+        """
+        Full refit of both GPs. With optimize=False, models that were fitted
+        before keep their kernel hyperparameters and only re-factorize.
+        """
         if len(self.X) < 5: return
         
-        X_all = np.array(self.X)
+        X_all = self.X
         y_feas = np.array(self.y_feas)
         
         # Filter for time model
         valid_indices = [i for i, f in enumerate(self.y_feas) if f > 0.5]
         
         try:
-            self.model_feas.fit(X_all, y_feas)
+            _fit_gp(self.model_feas, X_all, y_feas, optimize)
             if len(valid_indices) > 2:
-                self.model_time.fit(X_all[valid_indices], np.array(self.y_time))
+                _fit_gp(self.model_time, X_all[valid_indices], self._time_targets(), optimize)
             self.is_trained = True
         except Exception: pass
 
@@ -109,16 +415,70 @@ class SurrogateOracle:
         try:
             os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
             joblib.dump({
-                "X": self.X, "y_time": self.y_time, "y_feas": self.y_feas
+                "X": self.X, "y_time": self.y_time, "y_feas": self.y_feas,
+                # Fitted factors, so a warm start can predict without refitting
+                "gp_time": _gp_state(self.model_time),
+                "gp_feas": _gp_state(self.model_feas),
+                "y_scale": (self._y_mean, self._y_std),
+                "n_updates": self._n_updates,
             }, self.storage_path)
+            # Everything in the log is now part of the snapshot
+            open(self.log_path, 'w').close()
         except: pass
 
+    def _log_observation(self, x_vec, cost, is_crash):
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            row = {"i": self._n_updates - 1, "x": [float(v) for v in x_vec],
+                   "cost": float(cost), "crash": bool(is_crash)}
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(row) + "\n")
+        except: pass
+
+    def _replay_log(self):
+        """Re-applies observations logged after the last snapshot."""
+        if not os.path.exists(self.log_path):
+            return
+        replayed = 0
+        try:
+            with open(self.log_path) as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                row = json.loads(line)
+                if row["i"] < self._n_updates:
+                    continue # Already in the snapshot
+                x = np.asarray(row["x"], dtype=float)
+                cost, is_crash = float(row["cost"]), bool(row["crash"])
+                if x.ndim != 1 or (self._X_buf is not None and len(x) != self._X_buf.shape[1]):
+                    continue # Doesn't fit the history
+            except (ValueError, KeyError, TypeError):
+                continue # Torn line from an interrupted write, or a malformed row
+            self._record(x, cost, is_crash)
+            self._n_updates += 1
+            replayed += 1
+        if replayed:
+            self._prune()
+            # Restored factors don't cover the replayed rows
+            self.train(optimize=False)
+
     def _load_state(self):
         if os.path.exists(self.storage_path):
             try:
                 data = joblib.load(self.storage_path)
-                self.X = data["X"]
+                X = np.asarray(data["X"], dtype=float)
+                if len(X):
+                    self._X_buf = X.reshape(len(X), -1)
+                    self._n = len(X)
                 self.y_time = data["y_time"]
                 self.y_feas = data["y_feas"]
+                # Older knowledge bases only hold the raw history
+                _restore_gp(self.model_time, data.get("gp_time"))
+                _restore_gp(self.model_feas, data.get("gp_feas"))
+                self._y_mean, self._y_std = data.get("y_scale", (0.0, 1.0))
+                self._n_updates = data.get("n_updates", self._n)
                 self.is_trained = True
-            except: pass
\ No newline at end of file
+            except: pass
+        self._replay_log()
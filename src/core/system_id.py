@@ -3,10 +3,17 @@ import pandas as pd
 import numpy as np
 import logging
 import os
+import json
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
 from sklearn.metrics import mean_squared_error
 from src.interface.carmaker_interface import CarMakerInterface
 from src.core.parameter_manager import ParameterManager
 
+# Parquet schema-metadata key recording which channels the log cache holds
+_LOG_CACHE_KEY = b"target_channels"
+
 class SystemIdentifier:
     """
     PHASE 5: SYSTEM IDENTIFICATION (The 'Digital Twin' Engine)
@@ -18,25 +25,69 @@ class SystemIdentifier:
     """
     def __init__(self, real_log_path, storage_url):
         self.logger = logging.getLogger("SystemID")
+        
+        # We focus on these specific channels for correlation
+        self.target_channels = ['Time', 'Car.v', 'Car.YawRate', 'Car.ax', 'Car.ay']
+        
         self.real_data = self._load_log(real_log_path)
         self.storage_url = storage_url
         self.cm_interface = CarMakerInterface()
         self.param_manager = ParameterManager()
-        
-        # We focus on these specific channels for correlation
-        self.target_channels = ['Time', 'Car.v', 'Car.YawRate', 'Car.ax', 'Car.ay']
 
     def _load_log(self, path):
         try:
-            # Assumes CSV format: Time, v, YawRate, ax, ay
-            df = pd.read_csv(path)
+            # Parsed once into a Parquet copy next to the CSV, tagged with the
+            # channel selection it holds; re-parsed when the CSV is newer than
+            # the copy or target_channels changed.
+            cache_path = path + ".parquet"
+            channels = json.dumps(self.target_channels).encode()
+            df = self._read_log_cache(path, cache_path, channels)
+            if df is None:
+                # Assumes CSV format: Time, v, YawRate, ax, ay
+                # Only the correlation channels are tokenized; a log that names
+                # none of them is read whole.
+                header = pd.read_csv(path, nrows=0).columns
+                usecols = [c for c in header if c in self.target_channels] or None
+                df = pd.read_csv(path, usecols=usecols)
+                self._write_log_cache(df, cache_path, channels)
             # Resample real data to 50Hz to match CarMaker output if needed
             return df
         except Exception:
             self.logger.warning("⚠️ No Real World Log found. SystemID disabled.")
             return None
 
-    def calibrate(self, n_trials=50):
+    @staticmethod
+    def _read_log_cache(path, cache_path, channels):
+        """The cached log, or None if it is missing, stale or holds another channel selection."""
+        try:
+            if os.path.getmtime(cache_path) < os.path.getmtime(path):
+                return None
+            if (pq.read_schema(cache_path).metadata or {}).get(_LOG_CACHE_KEY) != channels:
+                return None
+            return pq.read_table(cache_path).to_pandas()
+        except Exception:
+            return None
+
+    def _write_log_cache(self, df, cache_path, channels):
+        """Writes the Parquet copy through a per-process tmp file + os.replace."""
+        tmp_path = f"{cache_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = {**(table.schema.metadata or {}), _LOG_CACHE_KEY: channels}
+            pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            self.logger.warning(f"Could not cache real log as Parquet: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def calibrate(self, n_trials=50, n_jobs=1):
+        """
+        Runs the sim-to-real calibration study.
+        n_jobs > 1 evaluates trials in parallel threads against the shared
+        RDB storage. Keep it at 1 once the objective drives CarMaker: the
+        interface kills every CarMaker process between runs.
+        """
         if self.real_data is None: return None
         
         study = optuna.create_study(
@@ -47,7 +98,7 @@ class SystemIdentifier:
         )
         
         self.logger.info("🔧 Starting Model Calibration (Sim-to-Real Matching)...")
-        study.optimize(self._calibration_objective, n_trials=n_trials)
+        study.optimize(self._calibration_objective, n_trials=n_trials, n_jobs=n_jobs)
         
         best_physics = study.best_params
         self.logger.info(f"✅ Calibration Complete. Real Car Stats: {best_physics}")
@@ -1,15 +1,20 @@
 import streamlit as st
-import optuna
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 import os
-import glob
+import json
+import sqlite3
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from contextlib import closing
 
 # --- CONFIGURATION ---
 PAGE_TITLE = "FSAE OPTIMIZER"
 BASE_OUTPUT_DIR = "Output"
+PLOT_MAX_TRIALS = 500 # Fastest trials sent to the 3D / parallel-coordinate plots
 
 st.set_page_config(
     page_title=PAGE_TITLE, 
@@ -37,58 +42,210 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- HELPER FUNCTIONS ---
+@st.cache_data(ttl=10) # New campaigns show up within 10 s
 def get_campaigns():
     if not os.path.exists(BASE_OUTPUT_DIR):
         return []
-    folders = glob.glob(os.path.join(BASE_OUTPUT_DIR, "Campaign_*"))
-    folders.sort(key=os.path.getmtime, reverse=True)
-    return [os.path.basename(f) for f in folders]
+    # One directory scan; DirEntry.stat() reuses the scan's data where the OS provides it
+    entries = [
+        (e.name, e.stat().st_mtime) for e in os.scandir(BASE_OUTPUT_DIR)
+        if e.name.startswith("Campaign_")
+    ]
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return [name for name, _ in entries]
 
-def load_study_data(db_path, selected_mode):
+# Completed trials of every study whose name contains the selected mode.
+# Timestamps are only selected as text (their int64 conversion used to
+# overflow), to tell cached trials apart from a recreated database.
+_TRIALS_SQL = """
+    SELECT t.trial_id, t.study_id, t.number, v.value AS "Lap Time", v.value_type,
+           CAST(t.datetime_start AS TEXT) AS started
+    FROM trials t
+    JOIN studies s ON s.study_id = t.study_id
+    LEFT JOIN trial_values v ON v.trial_id = t.trial_id AND v.objective = 0
+    WHERE t.state = 'COMPLETE' AND s.study_name LIKE ? ESCAPE '\\'
+"""
+_PARAMS_SQL = """
+    SELECT p.trial_id, p.param_name, p.param_value, p.distribution_json
+    FROM trial_params p
+    JOIN trials t ON t.trial_id = p.trial_id
+    JOIN studies s ON s.study_id = t.study_id
+    WHERE t.state = 'COMPLETE' AND s.study_name LIKE ? ESCAPE '\\'
+"""
+_ATTRS_SQL = """
+    SELECT a.trial_id, a."key", a.value_json
+    FROM trial_user_attributes a
+    JOIN trials t ON t.trial_id = a.trial_id
+    JOIN studies s ON s.study_id = t.study_id
+    WHERE t.state = 'COMPLETE' AND s.study_name LIKE ? ESCAPE '\\'
+"""
+_TRIAL_IDS_SQL = """
+    SELECT t.trial_id, CAST(t.datetime_start AS TEXT) AS started
+    FROM trials t
+    JOIN studies s ON s.study_id = t.study_id
+    WHERE t.state = 'COMPLETE' AND s.study_name LIKE ? ESCAPE '\\'
+"""
+_TRIAL_TABLES = (("trials", _TRIALS_SQL), ("params", _PARAMS_SQL), ("attrs", _ATTRS_SQL))
+
+def _query_trials(conn, sql, pattern, trial_ids=None):
+    """Runs one of the trial queries, optionally restricted to trial_ids."""
+    if trial_ids is None:
+        return pd.read_sql_query(sql, conn, params=(pattern,))
+    chunks = []
+    for i in range(0, len(trial_ids), 500): # Stay under SQLite's variable limit
+        chunk = trial_ids[i:i + 500]
+        restricted = sql + f" AND t.trial_id IN ({', '.join('?' * len(chunk))})"
+        chunks.append(pd.read_sql_query(restricted, conn, params=(pattern, *chunk)))
+    return pd.concat(chunks, ignore_index=True)
+
+def _read_trial_cache(cache_paths, completed):
+    """
+    The cached (trials, params, attrs) rows, or None if the sidecars are
+    missing, were written by different loads, or no longer match the DB.
+    """
+    if not all(os.path.exists(path) for path in cache_paths):
+        return None
+    try:
+        # Memory-mapped: the OS page cache backs the read across sessions
+        arrow = [pq.read_table(path, memory_map=True) for path in cache_paths]
+        generations = {(t.schema.metadata or {}).get(b"generation") for t in arrow}
+        if len(generations) != 1 or None in generations:
+            return None # Files from two different writes
+        cached = [t.to_pandas() for t in arrow]
+
+        trial_ids = cached[0]["trial_id"]
+        if not all(table["trial_id"].isin(trial_ids).all() for table in cached[1:]):
+            return None
+
+        # Completed trials never change, so a cached trial that is missing
+        # (or started at another time) means the database was recreated
+        known = cached[0][["trial_id", "started"]].merge(completed, how="left", indicator=True)
+        if (known["_merge"] != "both").any():
+            return None
+        return cached
+    except Exception:
+        return None
+
+def _write_trial_cache(tables, cache_paths):
     """
-    NUCLEAR OPTION: Drops datetime columns entirely to prevent INT64 Overflow.
+    Writes the sidecars through tmp files + os.replace, all tagged with one
+    generation id. trials.parquet decides which trials count as cached, so
+    it goes last and only once the params/attrs files are in place.
     """
-    storage_url = f"sqlite:///{os.path.abspath(db_path)}"
+    generation = uuid.uuid4().hex
+    tmp_path = None
     try:
-        summaries = optuna.get_all_study_summaries(storage=storage_url)
-        all_dfs = []
-        
-        for summary in summaries:
-            if selected_mode.lower() not in summary.study_name.lower():
-                continue
-                
-            study = optuna.load_study(study_name=summary.study_name, storage=storage_url)
-            df = study.trials_dataframe()
-            
-            # 1. Clean Column Names
-            df.columns = [col.replace("user_attrs_", "").replace("params_", "") for col in df.columns]
-            
-            # 2. Filter Completed
-            if "state" in df.columns:
-                df = df[df["state"] == "COMPLETE"]
-            
-            # 3. Rename Target
-            if "value" in df.columns:
-                df.rename(columns={"value": "Lap Time"}, inplace=True)
-            
-            # --- THE FIX: DELETE THE TIMESTAMPS ---
-            # Do not try to convert them. Just drop them. 
-            # These are the columns causing the 177007... overflow error.
-            cols_to_drop = ["datetime_start", "datetime_complete", "duration"]
-            df.drop(columns=[c for c in cols_to_drop if c in df.columns], inplace=True)
-            
-            # 4. Force everything else to Numeric
-            # If it can't be a number, coerce it to NaN, then drop the column if it's all NaN
-            df = df.apply(pd.to_numeric, errors='coerce')
-            df = df.dropna(axis=1, how='all') # Drop columns that failed completely (like 'state' string)
-            df = df.dropna(subset=["Lap Time"]) # Drop rows with no result
-            
-            all_dfs.append(df)
-        
-        if not all_dfs:
+        for table, path in reversed(list(zip(tables, cache_paths))):
+            arrow = pa.Table.from_pandas(table, preserve_index=False)
+            metadata = {**(arrow.schema.metadata or {}), b"generation": generation.encode()}
+            tmp_path = f"{path}.{generation}.tmp"
+            pq.write_table(arrow.replace_schema_metadata(metadata), tmp_path)
+            os.replace(tmp_path, path)
+            tmp_path = None
+    except Exception:
+        # The cache is an optimization only; a partial write is rejected on read
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _fetch_trial_tables(db_path, pattern, cache_prefix):
+    """
+    Raw (trials, params, attrs) rows of the completed trials. The rows are
+    mirrored to Parquet files next to the DB ('<cache_prefix>.<table>.parquet'),
+    so later sessions only read trials completed since the last load.
+    """
+    cache_paths = [f"{cache_prefix}.{name}.parquet" for name, _ in _TRIAL_TABLES]
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        completed = pd.read_sql_query(_TRIAL_IDS_SQL, conn, params=(pattern,))
+        cached = _read_trial_cache(cache_paths, completed)
+
+        if cached is None:
+            tables = [_query_trials(conn, sql, pattern) for _, sql in _TRIAL_TABLES]
+        else:
+            new_ids = completed.loc[~completed["trial_id"].isin(cached[0]["trial_id"]), "trial_id"].tolist()
+            if not new_ids:
+                return cached
+            tables = [
+                pd.concat([old, _query_trials(conn, sql, pattern, new_ids)], ignore_index=True)
+                for old, (_, sql) in zip(cached, _TRIAL_TABLES)
+            ]
+
+    _write_trial_cache(tables, cache_paths)
+    return tables
+
+def count_completed_trials(db_path):
+    """Cheap version tag for load_study_data's cache: completed trials in the DB."""
+    if not os.path.exists(db_path):
+        return 0
+    try:
+        uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM trials WHERE state = 'COMPLETE'").fetchone()[0]
+    except sqlite3.Error:
+        return -1
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_study_data(db_path, selected_mode, n_completed=None):
+    """
+    Reads completed trials straight from the Optuna SQLite tables: one
+    query each for values, params and user attributes over a single
+    read-only connection, pivoted to one row per trial. This replaces a
+    load_study() + trials_dataframe() ORM pass per study. The raw rows are
+    cached in Parquet beside the DB (see _fetch_trial_tables).
+    n_completed is only part of the cache key (see count_completed_trials):
+    widget reruns hit the cache until a new trial completes.
+    """
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+    try:
+        # LIKE is case-insensitive, matching the old substring test on study names
+        pattern = "%" + selected_mode.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        trials, params, attrs = _fetch_trial_tables(db_path, pattern, f"{db_path}.{selected_mode.lower()}")
+
+        if trials.empty:
             return pd.DataFrame()
-            
-        return pd.concat(all_dfs, ignore_index=True)
+
+        # Optuna stores infinite objectives as NULL plus a type tag
+        trials.loc[trials["value_type"] == "INF_POS", "Lap Time"] = np.inf
+        trials.loc[trials["value_type"] == "INF_NEG", "Lap Time"] = -np.inf
+
+        # Categorical params are stored as the index into their choices
+        is_cat = params["distribution_json"].str.contains("CategoricalDistribution", regex=False)
+        if is_cat.any():
+            choices = {d: json.loads(d)["attributes"]["choices"]
+                       for d in params.loc[is_cat, "distribution_json"].unique()}
+            params["param_value"] = params["param_value"].astype(object)
+            params.loc[is_cat, "param_value"] = [
+                choices[d][int(i)] for d, i in
+                zip(params.loc[is_cat, "distribution_json"], params.loc[is_cat, "param_value"])
+            ]
+        attrs["value"] = [json.loads(v) for v in attrs["value_json"]]
+
+        df = trials.set_index("trial_id")[["study_id", "number", "Lap Time"]]
+        df = df.join(params.pivot(index="trial_id", columns="param_name", values="param_value"))
+        df = df.join(attrs.pivot(index="trial_id", columns="key", values="value"))
+        df = df.sort_values(["study_id", "number"]).drop(columns="study_id")
+        df.columns.name = None
+
+        # Force everything to Numeric
+        # Values and params already come out of SQLite typed; only columns
+        # still holding Python objects (categorical choices, JSON attrs) are
+        # coerced. If it can't be a number it becomes NaN, and all-NaN
+        # columns are dropped.
+        df = df.infer_objects()
+        for col in df.select_dtypes(exclude=["number", "bool"]).columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.dropna(axis=1, how='all')
+        df = df.dropna(subset=["Lap Time"]) # Drop rows with no result
+
+        # Params and attrs only feed the plots: downcast once here so the
+        # cached frame is half the size. Lap Time stays float64 so that close
+        # laps still rank correctly.
+        for col in df.select_dtypes(include="float64").columns.drop("Lap Time"):
+            df[col] = pd.to_numeric(df[col], downcast="float")
+        df["number"] = pd.to_numeric(df["number"], downcast="integer")
+
+        return df.reset_index(drop=True)
 
     except Exception as e:
         st.error(f"Error loading database: {e}")
@@ -108,7 +265,7 @@ st.sidebar.markdown("---")
 mode = st.sidebar.radio("Optimization Mode", ["Dynamics", "Kinematics"])
 
 # --- DATA LOADING ---
-df = load_study_data(db_path, mode)
+df = load_study_data(db_path, mode, count_completed_trials(db_path))
 
 if df.empty:
     st.warning(f"⚠️ No completed trials found for **{mode}**.")
@@ -116,8 +273,8 @@ if df.empty:
 
 # Determine Parameters (Anything that isn't metadata)
 # We already dropped datetimes, so this is safer
-meta_cols = ["number", "Lap Time", "mass_penalty", "state"]
-param_cols = [c for c in df.columns if c not in meta_cols]
+meta_cols = {"number", "Lap Time", "mass_penalty", "state"}
+param_cols = [c for c in df.select_dtypes(include="number").columns if c not in meta_cols]
 
 # --- HEADER ---
 best_run = df.loc[df["Lap Time"].idxmin()]
@@ -136,15 +293,26 @@ tab1, tab2, tab3 = st.tabs(["📉 Convergence", "🌐 3D Map", "🕸️ Trade-of
 
 with tab1:
     st.markdown("### Lap Time History")
-    fig_conv = px.scatter(
-        df, x="number", y="Lap Time",
-        color="Lap Time",
-        color_continuous_scale="Plasma_r",
-        size_max=15,
-        hover_data=param_cols
+    # Hand-built Scattergl: the frame already holds the columns, so skip
+    # plotly-express's per-call dataframe pipeline
+    hover_params = "".join(
+        f"<br>{col}=%{{customdata[{i}]}}" for i, col in enumerate(param_cols)
     )
-    fig_conv.update_traces(marker=dict(size=12, line=dict(width=2, color='White')))
-    fig_conv.update_layout(template="plotly_dark", height=500)
+    fig_conv = go.Figure(go.Scattergl(
+        x=df["number"].to_numpy(),
+        y=df["Lap Time"].to_numpy(),
+        mode="markers",
+        marker=dict(
+            size=12, line=dict(width=2, color='White'),
+            color=df["Lap Time"].to_numpy(),
+            colorscale="Plasma_r",
+            showscale=True,
+            colorbar=dict(title="Lap Time")
+        ),
+        customdata=df[param_cols].to_numpy(),
+        hovertemplate="number=%{x}<br>Lap Time=%{y}" + hover_params + "<extra></extra>"
+    ))
+    fig_conv.update_layout(template="plotly_dark", height=500, xaxis_title="number", yaxis_title="Lap Time")
     st.plotly_chart(fig_conv, use_container_width=True)
 
 with tab2:
@@ -155,8 +323,11 @@ with tab2:
             x_ax = st.selectbox("X Axis", param_cols, index=0)
             y_ax = st.selectbox("Y Axis", param_cols, index=1)
         with c2:
+            # float32 halves the JSON payload; precision is irrelevant on screen
+            cols_3d = list(dict.fromkeys([x_ax, y_ax, "Lap Time"]))
+            df_3d = df.nsmallest(PLOT_MAX_TRIALS, "Lap Time")[cols_3d].astype("float32")
             fig_3d = px.scatter_3d(
-                df, x=x_ax, y=y_ax, z="Lap Time",
+                df_3d, x=x_ax, y=y_ax, z="Lap Time",
                 color="Lap Time",
                 color_continuous_scale="Plasma_r"
             )
@@ -170,8 +341,9 @@ with tab3:
     st.markdown("### Sensitivity Analysis")
     if len(df) > 1:
         plot_cols = param_cols + ["Lap Time"]
+        df_par = df.nsmallest(PLOT_MAX_TRIALS, "Lap Time")[plot_cols].astype("float32")
         fig_par = px.parallel_coordinates(
-            df, 
+            df_par, 
             color="Lap Time",
             dimensions=plot_cols,
             color_continuous_scale="Plasma_r"
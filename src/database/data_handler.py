@@ -82,7 +82,7 @@ class ResultHandler:
                 # Bundorf Analysis: Steer = L/R + K_us * Ay
                 # We regress Steer (deg) vs LatAcc (g)
                 x = lat_acc[mask_cornering] / 9.81 # g
-                y = steer[mask_cornering] * 57.296 # deg
+                y = np.rad2deg(steer[mask_cornering]) # deg
                 if len(x) > 10:
                     slope, _, _, _, _ = linregress(x, y)
                     understeer_gradient = slope # deg/g
@@ -148,19 +148,25 @@ class ResultHandler:
         """
         try:
             # Sampling frequency
-            dt = np.mean(np.diff(time))
+            # mean(diff(t)) telescopes to the endpoint span: O(1), no diff array
+            dt = (time[-1] - time[0]) / (len(time) - 1)
             if dt <= 0: return 0.0
             fs = 1.0 / dt
             
             # Welch's Method for Power Spectral Density (PSD)
             # nperseg=256 gives decent frequency resolution
-            f, Pxx_steer = welch(steer, fs, nperseg=256)
-            f, Pxx_yaw = welch(yaw_rate, fs, nperseg=256)
+            # Both channels in one call: one window/segment setup, one batched FFT
+            f, Pxx = welch(np.vstack((steer, yaw_rate)), fs, nperseg=256)
+            Pxx_steer, Pxx_yaw = Pxx
             
             # Transfer Function Magnitude Estimate |H(f)|
             # H(f) = Output / Input
             # Add epsilon to prevent divide by zero
-            magnitude = np.sqrt(Pxx_yaw) / (np.sqrt(Pxx_steer) + 1e-9)
+            # (in place on the fresh PSD arrays, no temporaries)
+            magnitude = np.sqrt(Pxx_yaw, out=Pxx_yaw)
+            denom = np.sqrt(Pxx_steer, out=Pxx_steer)
+            denom += 1e-9
+            magnitude /= denom
             
             # Normalize DC Gain (Low frequency gain) to 1.0
             # We assume the first 5 bins represent "Steady State"
@@ -0,0 +1,113 @@
+import numpy as np
+
+from src.core.surrogate import SurrogateOracle
+
+
+def _lap(x):
+    return 60.0 + float(np.sum((x - 0.5) ** 2))
+
+
+def _oracle(tmp_path, max_history=40, prune_target=30):
+    oracle = SurrogateOracle(storage_path=str(tmp_path / "kb.pkl"))
+    oracle.max_history = max_history
+    oracle.prune_target = prune_target
+    oracle.refit_interval = 1000 # Keep the runs on the cheap paths
+    return oracle
+
+
+def _feed(oracle, n, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        x = rng.random(3)
+        crash = bool(rng.random() < 0.2)
+        oracle.update_vec(x, 99.0 if crash else _lap(x), crash)
+
+
+def test_prune_keeps_history_aligned(tmp_path):
+    oracle = _oracle(tmp_path)
+    rng = np.random.default_rng(1)
+    rows = []
+    for _ in range(120):
+        x = rng.random(3)
+        crash = bool(rng.random() < 0.2)
+        rows.append((x, crash))
+        oracle.update_vec(x, 99.0 if crash else _lap(x), crash)
+
+        assert oracle._n <= oracle.max_history
+        assert len(oracle.y_feas) == oracle._n
+        assert len(oracle.y_time) == int(np.sum(np.asarray(oracle.y_feas) > 0.5))
+
+    # Every kept row still carries its own lap time and crash flag
+    valid = np.flatnonzero(np.asarray(oracle.y_feas) > 0.5)
+    for i, x in enumerate(oracle.X):
+        match = [crash for seen, crash in rows if np.array_equal(seen, x)]
+        assert match == [oracle.y_feas[i] < 0.5]
+    for i, y in zip(valid, oracle.y_time):
+        assert y == _lap(oracle.X[i])
+
+
+def test_prune_keeps_best_lap(tmp_path):
+    oracle = _oracle(tmp_path)
+    _feed(oracle, 20)
+    best = np.full(3, 0.5)
+    oracle.update_vec(best, _lap(best), False)
+    _feed(oracle, 100, seed=2)
+
+    assert min(oracle.y_time) == _lap(best)
+    assert any(np.array_equal(x, best) for x in oracle.X)
+
+
+def test_prune_hysteresis_leaves_rank1_updates(tmp_path, monkeypatch):
+    oracle = _oracle(tmp_path)
+    _feed(oracle, oracle.max_history)
+
+    trains = []
+    train = oracle.train
+    monkeypatch.setattr(oracle, "train", lambda optimize=True: (trains.append(oracle._n),
+                                                                 train(optimize)))
+    _feed(oracle, 1, seed=3)
+    assert oracle._n == oracle.prune_target
+    assert len(trains) == 1
+
+    # Until the cap is reached again, updates are rank-1 extensions
+    _feed(oracle, oracle.max_history - oracle.prune_target, seed=4)
+    assert oracle._n == oracle.max_history
+    assert len(trains) == 1
+    assert len(oracle.model_feas.X_train_) == oracle._n
+
+
+def test_snapshot_and_log_round_trip(tmp_path):
+    oracle = _oracle(tmp_path)
+    oracle.snapshot_interval = 25
+    _feed(oracle, 37) # One snapshot, then 12 rows in the log
+
+    with open(oracle.log_path) as f:
+        assert len(f.readlines()) == 12
+
+    restored = SurrogateOracle(storage_path=oracle.storage_path)
+    assert restored._n_updates == oracle._n_updates
+    assert np.array_equal(restored.X, oracle.X)
+    assert restored.y_time == oracle.y_time
+    assert restored.y_feas == oracle.y_feas
+    assert restored.is_trained
+
+    x = np.full(3, 0.3)
+    assert np.isclose(restored.predict_vec(x), oracle.predict_vec(x), rtol=1e-6, atol=1e-9)
+
+
+def test_replay_skips_malformed_rows(tmp_path):
+    oracle = _oracle(tmp_path)
+    _feed(oracle, 8)
+    with open(oracle.log_path, 'a') as f:
+        f.write('{"i": 8, "cost": 61.0, "crash": false}\n')           # no "x"
+        f.write('{"i": 8, "x": [0.1, 0.2], "cost": 61.0, "crash": false}\n')
+        f.write('{"i": 8, "x": [0.1, 0.2, 0.3], "cost": null, "crash": false}\n')
+        f.write('[1, 2, 3]\n')
+        f.write('{"i": 8, "x": [0.1, 0.2, 0.3], "cost": 61.0, "crash": false}\n')
+        f.write('{"i": 9, "x": [0.4, 0.5')                             # torn write
+
+    restored = SurrogateOracle(storage_path=oracle.storage_path)
+    assert restored._n == 9
+    assert restored._n_updates == 9
+    assert np.array_equal(restored.X[-1], [0.1, 0.2, 0.3])
+    assert restored.y_time[-1] == 61.0